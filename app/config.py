@@ -7,8 +7,23 @@ class Settings(BaseSettings):
     
     OUTPUT_DIR: str = "outputs"
     MAX_SIMULATION_DURATION_HOURS: int = 24
+    # Store results as typed arrays (float32, packed shadow mask) instead of a DataFrame
+    COMPACT_RESULTS: bool = False
 
     DATABASE_URL:str = "sqlite:///./simulations.db"
+
+    # Share one computation between identical concurrent requests in a worker
+    COALESCE_REQUESTS: bool = True
+    IDEMPOTENCY_WAIT_SECONDS: float = 300
+    IDEMPOTENCY_POLL_SECONDS: float = 0.5
+    IDEMPOTENCY_PENDING_TIMEOUT_SECONDS: float = 600
+    # Keys are forgotten this long after they completed, and their rows deleted
+    IDEMPOTENCY_TTL_SECONDS: float = 86400
+
+    WARMUP_ON_STARTUP: bool = True
+
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_SECONDS: float = 0.005
     
     class Config:
         env_file = ".env"
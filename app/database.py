@@ -1,14 +1,24 @@
 from sqlalchemy import create_engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 from sqlalchemy.orm import sessionmaker, Session
 from app.config import settings
 from app.models import Base
 
-engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False})
+if settings.DATABASE_URL.startswith("sqlite"):
+    # Local single-node mode; several workers on one host share the file
+    engine = create_engine(settings.DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30})
+else:
+    # Shared database (e.g. postgresql://...) for multiple workers or nodes
+    engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 def init_db():
-    Base.metadata.create_all(bind=engine)
+    try:
+        Base.metadata.create_all(bind=engine)
+    except (IntegrityError, OperationalError, ProgrammingError):
+        # Another worker created the tables between our existence check and CREATE
+        Base.metadata.create_all(bind=engine)
 
 def get_db() -> Session:
     db = SessionLocal()
@@ -1,18 +1,37 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import PlainTextResponse
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from datetime import datetime
 from app.routes import router
 from app.config import settings
-from app.schemas import HealthResponse
+from app.schemas import HealthResponse, ReadinessResponse
 from app.database import init_db
+from app.services.metrics import metrics
+from app.services.warmup import warmup_state
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    init_db()
+    # Warm up in the background so /health answers while the ephemeris loads
+    warmup_task = None
+    if settings.WARMUP_ON_STARTUP:
+        warmup_task = asyncio.create_task(asyncio.to_thread(warmup_state.run))
+    else:
+        warmup_state.ready = True
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        await warmup_task
 
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.VERSION,
     description="Backend API for solar panel power simulation on orbiting satellites",
     docs_url="/docs",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -23,8 +42,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-init_db()
-
 # Create output directory
 os.makedirs(settings.OUTPUT_DIR, exist_ok=True)
 app.mount("/outputs", StaticFiles(directory=settings.OUTPUT_DIR), name="outputs")
@@ -38,7 +55,9 @@ async def root():
         "message": "Solar Panel Power Simulator API",
         "version": settings.VERSION,
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready",
+        "metrics": "/metrics"
     }
 
 @app.get("/health", response_model=HealthResponse)
@@ -49,6 +68,24 @@ async def health_check():
         timestamp=datetime.utcnow().isoformat()
     )
 
+@app.get("/ready", response_model=ReadinessResponse)
+async def readiness_check(response: Response):
+    """Readiness probe: 503 until startup warmup has finished; a failed warmup reports degraded"""
+    if not warmup_state.ready:
+        response.status_code = 503
+    return ReadinessResponse(
+        status=("degraded" if warmup_state.error else "ready") if warmup_state.ready else "warming_up",
+        ready=warmup_state.ready,
+        warmup_seconds=warmup_state.duration_seconds,
+        error=warmup_state.error,
+        timestamp=datetime.utcnow().isoformat()
+    )
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus-style stage histograms, throughput counters, queue depth and cache hit rate of this worker only"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -45,3 +45,19 @@ class Simulation(Base):
     # Status
     status = Column(String, nullable=False)
     error_message = Column(Text, nullable=True)
+
+
+class IdempotencyRecord(Base):
+    """Client-supplied idempotency key and the response it resolved to, shared by all workers"""
+    __tablename__ = "idempotency_keys"
+    
+    idempotency_key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    
+    # pending while a worker computes it, then completed with the stored response
+    status = Column(String, nullable=False)
+    simulation_id = Column(String, nullable=True)
+    response_json = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
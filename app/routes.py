@@ -1,7 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from fastapi.responses import FileResponse
-from app.schemas import SimulationRequest, SimulationResponse, SimulationDetailResponse
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+from app.schemas import SimulationRequest, SimulationResponse, SimulationDetailResponse, EnergyBudgetRequest, EnergyBudgetResponse
 from app.services.simulator import SimulationService
+from app.services.energy_budget import EnergyBudgetService
+from app.services.metrics import metrics
+from app.services.coalescing import RequestCoalescer, request_fingerprint
+from app.services.idempotency import IdempotencyStore, IdempotencyConflictError, IdempotencyInProgressError
 from app.config import settings
 from app.database import get_db
 from datetime import datetime
@@ -11,10 +17,54 @@ import os
 
 router = APIRouter()
 simulator_service = SimulationService()
+energy_budget_service = EnergyBudgetService()
+simulation_coalescer = RequestCoalescer("inflight_simulations")
+energy_budget_coalescer = RequestCoalescer("inflight_energy_budgets")
+idempotency_store = IdempotencyStore()
 
 @router.post("/simulations", response_model=SimulationResponse, status_code=201)
-async def create_simulation(request: SimulationRequest):
-    result = simulator_service.run_simulation(request)
+async def create_simulation(
+    request: SimulationRequest,
+    idempotency_key: Optional[str] = Header(default=None, max_length=255, description="Repeat submissions with the same key return the first result")
+):
+    fingerprint = request_fingerprint(request)
+    
+    async def compute():
+        # Off the event loop, so other requests (and coalesced waiters) keep being served
+        if settings.COALESCE_REQUESTS:
+            return await simulation_coalescer.run(
+                fingerprint, lambda: run_in_threadpool(simulator_service.run_simulation, request)
+            )
+        return await run_in_threadpool(simulator_service.run_simulation, request)
+    
+    with metrics.track_in_progress():
+        try:
+            if idempotency_key:
+                result = await idempotency_store.run(idempotency_key, fingerprint, compute)
+            else:
+                result = await compute()
+        except IdempotencyConflictError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+        except IdempotencyInProgressError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+    
+    if result.status == "error":
+        raise HTTPException(status_code=400, detail=result.message)
+    
+    return result
+
+@router.post("/energy-budgets", response_model=EnergyBudgetResponse, status_code=201)
+async def create_energy_budget(request: EnergyBudgetRequest):
+    """
+    Orbit-averaged energy budget over long horizons (up to 365 days)
+    """
+    with metrics.track_in_progress():
+        if settings.COALESCE_REQUESTS:
+            result = await energy_budget_coalescer.run(
+                request_fingerprint(request), lambda: run_in_threadpool(energy_budget_service.run_budget, request)
+            )
+        else:
+            result = await run_in_threadpool(energy_budget_service.run_budget, request)
     
     if result.status == "error":
         raise HTTPException(status_code=400, detail=result.message)
@@ -36,6 +86,8 @@ async def get_output_file(filename: str):
         media_type = "image/png"
     elif filename.endswith('.csv'):
         media_type = "text/csv"
+    elif filename.endswith('.txt'):
+        media_type = "text/plain"
     else:
         media_type = "application/octet-stream"    
 
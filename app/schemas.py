@@ -8,27 +8,71 @@ class OrbitParametersBase(BaseModel):
     inclination_deg: Optional[float] = Field(default=51.6, ge=0, le=180, description="Orbit inclination in degrees (for circular method)")
     tle_line1: Optional[str] = Field(default=None, description="TLE line 1 (for TLE method)")
     tle_line2: Optional[str] = Field(default=None, description="TLE line 2 (for TLE method)")
+
+    #validate tle_line1 and tle_line2 is provided when propagtion_method is set to tle
+    @model_validator(mode='after')
+    def validate_tle_required(self):
+        if self.propagation_method == 'tle':
+            if not self.tle_line1 or not self.tle_line2:
+                raise ValueError("TLE lines (tle_line1 and tle_line2) are required when using TLE propagation")
+        return self
     
 class PanelParametersBase(BaseModel):
     panel_area_m2: float = Field(default=15.0, ge=1, le=100, description="Solar panel area in square meters")
     panel_efficiency: float = Field( default=0.29, ge=0.1, le=0.5, description="Panel efficiency (0.29 = 29%)")
     
+class PanelFace(BaseModel):
+    name: str = Field(min_length=1, max_length=32, pattern=r"^[A-Za-z0-9_\-]+$", description="Face name, used in per-face output")
+    normal: list[float] = Field(min_length=3, max_length=3, description="Face normal in the body frame (x=along-track, y=orbit normal, z=zenith)")
+    area_m2: float = Field(ge=0.01, le=100, description="Panel area on this face in square meters")
+
+class PanelModelParametersBase(BaseModel):
+    panel_model: Literal["anti_nadir", "single_axis", "sun_tracking", "body_panels"] = Field(default="anti_nadir", description="Panel attitude model")
+    tracking_axis: list[float] = Field(default=[0.0, 1.0, 0.0], min_length=3, max_length=3, description="Rotation axis in the body frame (for single_axis)")
+    panel_faces: Optional[list[PanelFace]] = Field(default=None, min_length=1, max_length=32, description="Panel faces (for body_panels; panel_area_m2 is ignored)")
+
+    #validate panel_faces is provided when panel_model is set to body_panels
+    @model_validator(mode='after')
+    def validate_panel_faces(self):
+        if self.panel_model == 'body_panels':
+            if not self.panel_faces:
+                raise ValueError("panel_faces is required when using the body_panels model")
+            names = [face.name for face in self.panel_faces]
+            if len(set(names)) != len(names):
+                raise ValueError("panel_faces names must be unique")
+            if any(not any(face.normal) for face in self.panel_faces):
+                raise ValueError("panel_faces normals must be non-zero")
+        if self.panel_model == 'single_axis' and not any(self.tracking_axis):
+            raise ValueError("tracking_axis must be non-zero")
+        return self
+
+class GroundStation(BaseModel):
+    name: str = Field(min_length=1, max_length=32, pattern=r"^[A-Za-z0-9_\-]+$", description="Station name, used in per-station output")
+    latitude_deg: float = Field(ge=-90, le=90, description="Geodetic latitude in degrees")
+    longitude_deg: float = Field(ge=-180, le=180, description="Longitude in degrees, east positive")
+    altitude_m: float = Field(default=0, ge=-500, le=9000, description="Height above the WGS84 ellipsoid in meters")
+    min_elevation_deg: float = Field(default=5, ge=0, le=90, description="Minimum elevation for a usable contact")
+
 class SimulationParametersBase(BaseModel):
     start_time: str = Field(default="2024-01-15T00:00:00", description="Simulation start time (ISO format)")
     duration_hours: float = Field(default=3.0, ge=0.1, le=24, description="Simulation duration in hours")
     time_step_seconds: int = Field(default=60, ge=1, le=300, description="Time step in seconds")
 
-class SimulationRequest(OrbitParametersBase, PanelParametersBase, SimulationParametersBase):    
+class SimulationRequest(OrbitParametersBase, PanelParametersBase, PanelModelParametersBase, SimulationParametersBase):    
     # Output options
     generate_plot: bool = Field(default=True, description="Generate visualization plot")
     export_csv: bool = Field(default=True, description="Export results to CSV")
+    include_timings: bool = Field(default=False, description="Return per-stage timings in the response")
+    profile: bool = Field(default=False, description="Run the sampling profiler for this request (requires PROFILING_ENABLED)")
+    ground_stations: Optional[list[GroundStation]] = Field(default=None, max_length=50, description="Ground stations to compute contact windows for")
     
-    #validate tle_line1 and tle_line2 is provided when propagtion_method is set to tle
+    #validate ground station names are unique, they key the per-station output
     @model_validator(mode='after')
-    def validate_tle_required(self):
-        if self.propagation_method == 'tle':
-            if not self.tle_line1 or not self.tle_line2:
-                raise ValueError("TLE lines (tle_line1 and tle_line2) are required when using TLE propagation")
+    def validate_ground_stations(self):
+        if self.ground_stations:
+            names = [station.name for station in self.ground_stations]
+            if len(set(names)) != len(names):
+                raise ValueError("ground_stations names must be unique")
         return self
     
     model_config = ConfigDict(
@@ -48,12 +92,50 @@ class SimulationRequest(OrbitParametersBase, PanelParametersBase, SimulationPara
         }
     )
 
+class EnergyBudgetRequest(OrbitParametersBase, PanelParametersBase, PanelModelParametersBase):
+    start_time: str = Field(default="2024-01-15T00:00:00", description="Budget start time (ISO format)")
+    duration_days: float = Field(default=30, ge=1, le=365, description="Budget horizon in days")
+    time_step_seconds: int = Field(default=30, ge=1, le=300, description="Time step within each representative orbit")
+    representative_orbits: int = Field(default=64, ge=2, le=1000, description="Number of orbits simulated at full resolution")
+    aggregation: Literal["daily", "orbit"] = Field(default="daily", description="Aggregate the series per day or per orbit")
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "example": {
+                "propagation_method": "circular",
+                "altitude_km": 500,
+                "inclination_deg": 51.6,
+                "panel_area_m2": 15.0,
+                "panel_efficiency": 0.29,
+                "start_time": "2024-01-15T00:00:00",
+                "duration_days": 365,
+                "time_step_seconds": 30,
+                "representative_orbits": 64,
+                "aggregation": "daily"
+            }
+        }
+    )
+
 class DataPoint(BaseModel):
     time: str
     power_W: float
     in_shadow: bool
-    sun_angle_deg: float
+    sun_angle_deg: float = Field(description="Angle between the local zenith and the sun, independent of the panel model")
     altitude_km: float
+    face_power_W: Optional[dict[str, float]] = None
+
+class FaceStatistics(BaseModel):
+    name: str
+    area_m2: float
+    max_power_W: float
+    avg_power_W: float
+
+class ContactWindow(BaseModel):
+    station: str
+    start_time: str
+    end_time: str
+    duration_seconds: float
+    max_elevation_deg: float
 
 class SimulationStatistics(BaseModel):
     max_power_W: float
@@ -70,9 +152,36 @@ class SimulationResponse(BaseModel):
     status: str
     message: str
     statistics: Optional[SimulationStatistics] = None
+    face_statistics: Optional[list[FaceStatistics]] = None
+    contact_windows: Optional[list[ContactWindow]] = None
     data_points: Optional[list[DataPoint]] = None
     plot_url: Optional[str] = None
     csv_url: Optional[str] = None
+    profile_url: Optional[str] = None
+    timings_ms: Optional[dict[str, float]] = None
+    created_at: str
+
+class EnergyBudgetPoint(BaseModel):
+    start_time: str
+    orbits: int
+    beta_deg: float
+    energy_Wh: float
+    avg_power_W: float
+    eclipse_fraction: float
+
+class EnergyBudgetResponse(BaseModel):
+    budget_id: str
+    status: str
+    message: str
+    orbital_period_minutes: Optional[float] = None
+    total_orbits: Optional[int] = None
+    representative_orbits: Optional[int] = None
+    total_energy_Wh: Optional[float] = None
+    avg_power_W: Optional[float] = None
+    eclipse_fraction: Optional[float] = None
+    min_beta_deg: Optional[float] = None
+    max_beta_deg: Optional[float] = None
+    series: Optional[list[EnergyBudgetPoint]] = None
     created_at: str
 
 class HealthResponse(BaseModel):
@@ -80,6 +189,13 @@ class HealthResponse(BaseModel):
     version: str
     timestamp: str
 
+class ReadinessResponse(BaseModel):
+    status: str
+    ready: bool
+    warmup_seconds: Optional[float] = None
+    error: Optional[str] = None
+    timestamp: str
+
 class SimulationStatisticsBase(BaseModel):
     max_power_W: Optional[float] = None
     avg_power_W: Optional[float] = None
@@ -0,0 +1,43 @@
+import asyncio
+import hashlib
+import json
+from pydantic import BaseModel
+from app.services.metrics import metrics
+
+
+def request_fingerprint(request: BaseModel) -> str:
+    """Stable hash of every request field, identical requests share a fingerprint"""
+    canonical = json.dumps(request.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class RequestCoalescer:
+    """
+    Shares one in-flight computation between identical concurrent requests in
+    this worker. The first caller starts the computation; callers arriving
+    while it runs await the same result instead of starting their own.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight = {}
+
+    async def run(self, key: str, compute):
+        """
+        key: request fingerprint
+        compute: zero-argument coroutine function producing the result
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            metrics.record_cache(self.name, hit=False)
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._release(key, done))
+        else:
+            metrics.record_cache(self.name, hit=True)
+        # A cancelled caller must not cancel the computation other callers are waiting on
+        return await asyncio.shield(future)
+
+    def _release(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
@@ -0,0 +1,160 @@
+import uuid
+from datetime import datetime, timedelta
+import numpy as np
+from app.schemas import EnergyBudgetRequest, EnergyBudgetResponse, EnergyBudgetPoint
+from app.services.orbit_propagator import SolarPanelSimulator, create_propagator, parse_start_time
+from app.services.panel_models import create_panel_model
+
+SECONDS_PER_DAY = 86400
+
+# Upper bound on time steps evaluated in one vectorized batch, keeps peak memory flat
+MAX_BATCH_SAMPLES = 200_000
+
+
+class EnergyBudgetService:
+    """
+    Long-horizon (days to a year) orbit-averaged power budget.
+
+    Stepping every orbit of a year at fine resolution is what the regular
+    simulation cannot afford. Instead the budget advances by whole orbits:
+    for every orbit only the sun vector and orbit normal at its start are
+    evaluated, giving the beta angle (sun elevation above the orbit plane).
+    A set of representative orbits spread over the horizon is simulated at
+    full resolution, and since orbit-averaged power and eclipse fraction are
+    driven by the beta angle, every other orbit is interpolated from them by
+    its beta angle.
+    """
+
+    def run_budget(self, request: EnergyBudgetRequest) -> EnergyBudgetResponse:
+        budget_id = str(uuid.uuid4())
+
+        try:
+            propagator = create_propagator(request, satellite_name=f"SAT_{budget_id[:8]}")
+            simulator = SolarPanelSimulator(
+                orbit_propagator=propagator,
+                panel_area_m2=request.panel_area_m2,
+                panel_efficiency=request.panel_efficiency,
+                panel_model=create_panel_model(request)
+            )
+            start_dt = parse_start_time(request.start_time)
+            period_s = propagator.get_orbital_period() * 60
+
+            total_orbits = int(request.duration_days * SECONDS_PER_DAY // period_s)
+            if total_orbits == 0:
+                raise ValueError(
+                    f"duration_days ({request.duration_days}) is shorter than one orbital period "
+                    f"({period_s / 60:.1f} min); the budget needs at least one complete orbit"
+                )
+            orbit_offsets = np.arange(total_orbits) * period_s
+
+            # Beta angle of every orbit from the sun vector drift and orbit plane evolution
+            normals = propagator.get_orbit_normals(start_dt, orbit_offsets)
+            sun_directions = simulator.get_sun_directions(start_dt, orbit_offsets)
+            beta_deg = np.degrees(np.arcsin(np.clip(np.einsum('ij,ij->i', normals, sun_directions), -1, 1)))
+
+            representative = self.select_representative_orbits(beta_deg, request.representative_orbits)
+            rep_energy_Wh, rep_eclipse = self.simulate_orbits(
+                simulator, start_dt, orbit_offsets[representative], period_s, request.time_step_seconds
+            )
+
+            # Interpolate every orbit from the representative ones by beta angle
+            order = np.argsort(beta_deg[representative])
+            rep_beta = beta_deg[representative][order]
+            energy_Wh = np.interp(beta_deg, rep_beta, rep_energy_Wh[order])
+            eclipse_fraction = np.interp(beta_deg, rep_beta, rep_eclipse[order])
+            # Simulated orbits keep their own exact values
+            energy_Wh[representative] = rep_energy_Wh
+            eclipse_fraction[representative] = rep_eclipse
+
+            period_hours = period_s / 3600
+            if request.aggregation == "orbit":
+                series = self.aggregate_orbits(start_dt, orbit_offsets, beta_deg, energy_Wh, eclipse_fraction, period_hours)
+            else:
+                series = self.aggregate_daily(start_dt, orbit_offsets, beta_deg, energy_Wh, eclipse_fraction, period_hours)
+
+            total_energy_Wh = float(energy_Wh.sum())
+            return EnergyBudgetResponse(
+                budget_id=budget_id,
+                status="success",
+                message="Energy budget completed successfully",
+                orbital_period_minutes=float(propagator.get_orbital_period()),
+                total_orbits=total_orbits,
+                representative_orbits=len(representative),
+                total_energy_Wh=total_energy_Wh,
+                avg_power_W=total_energy_Wh / (total_orbits * period_hours),
+                eclipse_fraction=float(eclipse_fraction.mean()),
+                min_beta_deg=float(beta_deg.min()),
+                max_beta_deg=float(beta_deg.max()),
+                series=series,
+                created_at=datetime.utcnow().isoformat()
+            )
+
+        except Exception as e:
+            return EnergyBudgetResponse(
+                budget_id=budget_id,
+                status="error",
+                message=f"Energy budget failed: {str(e)}",
+                created_at=datetime.utcnow().isoformat()
+            )
+
+    def select_representative_orbits(self, beta_deg: np.ndarray, count: int) -> np.ndarray:
+        """Orbits evenly spread in time, plus the extremes of the beta angle range"""
+        evenly_spaced = np.linspace(0, len(beta_deg) - 1, min(count, len(beta_deg))).round().astype(int)
+        extremes = [int(np.argmin(beta_deg)), int(np.argmax(beta_deg))]
+        return np.unique(np.concatenate([evenly_spaced, extremes]))
+
+    def simulate_orbits(self, simulator: SolarPanelSimulator, start_dt: datetime, orbit_offsets: np.ndarray,
+                        period_s: float, time_step_seconds: int) -> tuple[np.ndarray, np.ndarray]:
+        """Energy (Wh) and eclipse fraction of each given orbit, at full time resolution"""
+        samples_per_orbit = max(int(np.ceil(period_s / time_step_seconds)), 1)
+        # Split the orbit into equal steps so the samples tile it exactly
+        dt = period_s / samples_per_orbit
+        step_offsets = np.arange(samples_per_orbit) * dt
+        orbits_per_batch = max(MAX_BATCH_SAMPLES // samples_per_orbit, 1)
+
+        energy_Wh = np.empty(len(orbit_offsets))
+        eclipse_fraction = np.empty(len(orbit_offsets))
+        for first in range(0, len(orbit_offsets), orbits_per_batch):
+            batch = orbit_offsets[first:first + orbits_per_batch]
+            offsets = (batch[:, None] + step_offsets).ravel()
+            step_batch = simulator.evaluate(start_dt, offsets)
+            power = step_batch.face_power.sum(axis=1)
+            in_shadow = step_batch.in_shadow
+
+            energy_Wh[first:first + len(batch)] = power.reshape(len(batch), -1).sum(axis=1) * dt / 3600
+            eclipse_fraction[first:first + len(batch)] = in_shadow.reshape(len(batch), -1).mean(axis=1)
+
+        return energy_Wh, eclipse_fraction
+
+    def aggregate_orbits(self, start_dt, orbit_offsets, beta_deg, energy_Wh, eclipse_fraction, period_hours) -> list[EnergyBudgetPoint]:
+        return [
+            EnergyBudgetPoint(
+                start_time=(start_dt + timedelta(seconds=float(offset))).isoformat(),
+                orbits=1,
+                beta_deg=float(beta),
+                energy_Wh=float(energy),
+                avg_power_W=float(energy / period_hours),
+                eclipse_fraction=float(eclipse)
+            )
+            for offset, beta, energy, eclipse in zip(orbit_offsets, beta_deg, energy_Wh, eclipse_fraction)
+        ]
+
+    def aggregate_daily(self, start_dt, orbit_offsets, beta_deg, energy_Wh, eclipse_fraction, period_hours) -> list[EnergyBudgetPoint]:
+        """Orbits are assigned to the 24 h window (counted from start_time) in which they start"""
+        day = (orbit_offsets // SECONDS_PER_DAY).astype(int)
+        orbits = np.bincount(day)
+        day_energy = np.bincount(day, weights=energy_Wh)
+        day_eclipse = np.bincount(day, weights=eclipse_fraction)
+        day_beta = np.bincount(day, weights=beta_deg)
+
+        return [
+            EnergyBudgetPoint(
+                start_time=(start_dt + timedelta(days=d)).isoformat(),
+                orbits=int(orbits[d]),
+                beta_deg=float(day_beta[d] / orbits[d]),
+                energy_Wh=float(day_energy[d]),
+                avg_power_W=float(day_energy[d] / (orbits[d] * period_hours)),
+                eclipse_fraction=float(day_eclipse[d] / orbits[d])
+            )
+            for d in range(len(orbits)) if orbits[d] > 0
+        ]
@@ -0,0 +1,73 @@
+import numpy as np
+from skyfield.api import wgs84
+from skyfield.earthlib import earth_rotation_angle
+from skyfield.framelib import itrs
+
+
+def station_elevations(stations, times, positions):
+    """
+    Elevation (deg) of the satellite above each station's local horizon, shape (n_steps, n_stations).
+    stations: objects with latitude_deg, longitude_deg and altitude_m
+    times: skyfield Time array of the simulation grid (at most about a day long)
+    positions: (n_steps, 3) satellite positions in km from the same pass
+    """
+    sites = [wgs84.latlon(s.latitude_deg, s.longitude_deg, elevation_m=s.altitude_m) for s in stations]
+    site_itrs = np.array([site.itrs_xyz.km for site in sites])
+    lat = np.radians([s.latitude_deg for s in stations])
+    lon = np.radians([s.longitude_deg for s in stations])
+    # Geodetic local vertical (ellipsoid normal) in the Earth-fixed frame
+    up_itrs = np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+    # Earth-fixed to inertial is R(t)^T with R(t) = rot_z(-GAST(t)) @ precession-nutation(t).
+    # Precession-nutation drifts by well under an arcsecond over a day, so it is taken once
+    # at the middle of the grid and only the Earth rotation angle is advanced per step:
+    # R(t)^T ~= R(t_mid)^T @ rot_z(ERA(t) - ERA(t_mid))
+    era = earth_rotation_angle(times.whole, times.ut1_fraction)
+    mid = len(era) // 2
+    rotation_mid = itrs.rotation_at(times[mid])
+    angle = 2 * np.pi * ((era - era[mid]) % 1.0)
+    site_positions = _earth_fixed_to_inertial(site_itrs, angle, rotation_mid)
+    up = _earth_fixed_to_inertial(up_itrs, angle, rotation_mid)
+
+    line_of_sight = positions[:, None, :] - site_positions
+    sin_elevation = np.einsum('nsi,nsi->ns', line_of_sight, up) / np.linalg.norm(line_of_sight, axis=2)
+    return np.degrees(np.arcsin(np.clip(sin_elevation, -1, 1)))
+
+
+def _earth_fixed_to_inertial(vectors, angle, rotation_mid):
+    """Rotate (n_stations, 3) Earth-fixed vectors by each step's angle, then by R(t_mid)^T: (n_steps, n_stations, 3)"""
+    c = np.cos(angle)[:, None]
+    s = np.sin(angle)[:, None]
+    x, y, z = vectors[:, 0], vectors[:, 1], vectors[:, 2]
+    rotated = np.stack([c * x - s * y, s * x + c * y, np.broadcast_to(z, (len(angle), len(z)))], axis=2)
+    return rotated @ rotation_mid
+
+
+def find_contact_windows(elapsed_s, elevation_deg, min_elevation_deg):
+    """
+    Intervals where elevation_deg >= min_elevation_deg, as (start_s, end_s, max_elevation_deg).
+    Rise and set times are linearly interpolated between steps; windows still open
+    at the start or end of the simulation are cut at its boundary.
+    """
+    elapsed_s = np.asarray(elapsed_s, dtype=float)
+    elevation_deg = np.asarray(elevation_deg, dtype=float)
+    visible = elevation_deg >= min_elevation_deg
+    edges = np.diff(np.concatenate([[0], visible.astype(np.int8), [0]]))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1) - 1
+
+    windows = []
+    for first, last in zip(starts, ends):
+        start_s = elapsed_s[first]
+        if first > 0:
+            start_s = _crossing(elapsed_s, elevation_deg, first - 1, first, min_elevation_deg)
+        end_s = elapsed_s[last]
+        if last < len(elapsed_s) - 1:
+            end_s = _crossing(elapsed_s, elevation_deg, last, last + 1, min_elevation_deg)
+        windows.append((float(start_s), float(end_s), float(elevation_deg[first:last + 1].max())))
+    return windows
+
+
+def _crossing(elapsed_s, elevation_deg, i, j, threshold):
+    fraction = (threshold - elevation_deg[i]) / (elevation_deg[j] - elevation_deg[i])
+    return elapsed_s[i] + fraction * (elapsed_s[j] - elapsed_s[i])
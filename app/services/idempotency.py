@@ -0,0 +1,158 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from starlette.concurrency import run_in_threadpool
+from app.config import settings
+from app.database import SessionLocal
+from app.models import IdempotencyRecord
+from app.schemas import SimulationResponse
+
+
+class IdempotencyConflictError(Exception):
+    """The idempotency key was already used with a different request body"""
+
+
+class IdempotencyInProgressError(Exception):
+    """Another worker is still computing this key and did not finish within the wait time"""
+
+
+class IdempotencyStore:
+    """
+    Database-backed idempotency keys, shared by every worker using DATABASE_URL.
+    The first submission of a key claims it and computes; concurrent or later
+    submissions with the same key and body wait for and return the stored
+    response instead of running the simulation again.
+    Only successful responses are stored. An error response releases the key,
+    since most come from transient failures, so a retry with it runs again.
+    Keys expire IDEMPOTENCY_TTL_SECONDS after completing; expired rows are
+    purged from the table at most every PURGE_INTERVAL_SECONDS per worker.
+    """
+
+    PURGE_INTERVAL_SECONDS = 300
+
+    def __init__(self):
+        self._next_purge = 0.0
+
+    async def run(self, key: str, request_hash: str, compute) -> SimulationResponse:
+        """
+        compute: zero-argument coroutine function producing the SimulationResponse
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_SECONDS
+        while True:
+            claimed, record = await run_in_threadpool(self._claim, key, request_hash)
+            if claimed:
+                try:
+                    response = await compute()
+                except BaseException:
+                    # Let the next submission of this key try again
+                    await run_in_threadpool(self._release, key)
+                    raise
+                if response.status == "error":
+                    await run_in_threadpool(self._release, key)
+                else:
+                    await run_in_threadpool(self._complete, key, response)
+                return response
+
+            if record["request_hash"] != request_hash:
+                raise IdempotencyConflictError(f"Idempotency key '{key}' was already used with a different request")
+            if record["status"] == "completed":
+                return SimulationResponse.model_validate_json(record["response_json"])
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgressError(f"Request with idempotency key '{key}' is still in progress")
+            await asyncio.sleep(settings.IDEMPOTENCY_POLL_SECONDS)
+
+    def _claim(self, key: str, request_hash: str) -> tuple[bool, Optional[dict]]:
+        db = SessionLocal()
+        try:
+            now = datetime.utcnow()
+            expired_before = now - timedelta(seconds=settings.IDEMPOTENCY_TTL_SECONDS)
+            if time.monotonic() >= self._next_purge:
+                self._next_purge = time.monotonic() + self.PURGE_INTERVAL_SECONDS
+                db.execute(delete(IdempotencyRecord).where(IdempotencyRecord.updated_at < expired_before))
+                db.commit()
+
+            db.add(IdempotencyRecord(
+                idempotency_key=key,
+                request_hash=request_hash,
+                status="pending",
+                created_at=now,
+                updated_at=now
+            ))
+            try:
+                db.commit()
+                return True, None
+            except IntegrityError:
+                db.rollback()
+
+            record = db.get(IdempotencyRecord, key)
+            if record is None:
+                # Released between our insert and read, try again on the next poll
+                return False, {"request_hash": request_hash, "status": "pending", "response_json": None}
+
+            stale_before = now - timedelta(seconds=settings.IDEMPOTENCY_PENDING_TIMEOUT_SECONDS)
+            if record.status == "pending" and record.request_hash == request_hash and record.updated_at < stale_before:
+                # The worker that claimed it died; take over atomically
+                taken = db.execute(
+                    update(IdempotencyRecord)
+                    .where(IdempotencyRecord.idempotency_key == key)
+                    .where(IdempotencyRecord.status == "pending")
+                    .where(IdempotencyRecord.updated_at == record.updated_at)
+                    .values(updated_at=now)
+                ).rowcount
+                db.commit()
+                if taken:
+                    return True, None
+
+            if record.status == "completed" and record.updated_at < expired_before:
+                # Expired but not purged yet; reclaim it as a fresh key, possibly with a new body
+                taken = db.execute(
+                    update(IdempotencyRecord)
+                    .where(IdempotencyRecord.idempotency_key == key)
+                    .where(IdempotencyRecord.updated_at == record.updated_at)
+                    .values(request_hash=request_hash, status="pending", simulation_id=None, response_json=None,
+                            created_at=now, updated_at=now)
+                ).rowcount
+                db.commit()
+                if taken:
+                    return True, None
+                # Another worker reclaimed it first, read its state on the next poll
+                return False, {"request_hash": request_hash, "status": "pending", "response_json": None}
+
+            return False, {
+                "request_hash": record.request_hash,
+                "status": record.status,
+                "response_json": record.response_json
+            }
+        finally:
+            db.close()
+
+    def _complete(self, key: str, response: SimulationResponse):
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(IdempotencyRecord)
+                .where(IdempotencyRecord.idempotency_key == key)
+                .values(
+                    status="completed",
+                    simulation_id=response.simulation_id,
+                    response_json=response.model_dump_json(),
+                    updated_at=datetime.utcnow()
+                )
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _release(self, key: str):
+        db = SessionLocal()
+        try:
+            db.query(IdempotencyRecord).filter(
+                IdempotencyRecord.idempotency_key == key,
+                IdempotencyRecord.status == "pending"
+            ).delete()
+            db.commit()
+        finally:
+            db.close()
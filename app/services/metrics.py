@@ -0,0 +1,144 @@
+import threading
+import time
+from contextlib import contextmanager
+
+# Histogram buckets in seconds, spanning sub-millisecond stages up to long runs
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class StageTimer:
+    """Accumulates wall-clock time per named stage of a single simulation run"""
+
+    def __init__(self):
+        # Insertion ordered, so stages are reported in the order they first ran
+        self.durations = {}
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + (time.perf_counter() - start)
+
+    def total_seconds(self):
+        return sum(self.durations.values())
+
+    def as_milliseconds(self):
+        return {name: round(seconds * 1000, 3) for name, seconds in self.durations.items()}
+
+
+class Histogram:
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for i, upper in enumerate(self.buckets):
+            if value <= upper:
+                self.counts[i] += 1
+
+
+class MetricsRegistry:
+    """
+    Process-wide simulation metrics, rendered in the Prometheus text exposition format.
+    Counters are cumulative; throughput is derived by the scraper with rate().
+    Nothing is shared between workers: each process reports only its own runs,
+    so every worker has to be scraped as its own target and aggregated with sum().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stage_seconds = {}
+        self.simulation_seconds = Histogram()
+        self.simulations_total = {}
+        self.data_points_total = 0
+        self.in_progress = 0
+        self.cache_hits = {}
+        self.cache_misses = {}
+
+    def observe_run(self, timer: StageTimer, status: str, data_points: int = 0):
+        with self._lock:
+            for name, seconds in timer.durations.items():
+                self.stage_seconds.setdefault(name, Histogram()).observe(seconds)
+            self.simulation_seconds.observe(timer.total_seconds())
+            self.simulations_total[status] = self.simulations_total.get(status, 0) + 1
+            self.data_points_total += data_points
+
+    def record_cache(self, cache: str, hit: bool):
+        with self._lock:
+            counter = self.cache_hits if hit else self.cache_misses
+            counter[cache] = counter.get(cache, 0) + 1
+
+    @contextmanager
+    def track_in_progress(self):
+        with self._lock:
+            self.in_progress += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_progress -= 1
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            lines.append("# HELP simulation_stage_seconds Time spent in each stage of a simulation run")
+            lines.append("# TYPE simulation_stage_seconds histogram")
+            for name, histogram in self.stage_seconds.items():
+                lines.extend(self._render_histogram("simulation_stage_seconds", histogram, f'stage="{name}"'))
+
+            lines.append("# HELP simulation_duration_seconds Total time of a simulation run")
+            lines.append("# TYPE simulation_duration_seconds histogram")
+            lines.extend(self._render_histogram("simulation_duration_seconds", self.simulation_seconds))
+
+            lines.append("# HELP simulations_total Completed simulation runs by status")
+            lines.append("# TYPE simulations_total counter")
+            for status, count in self.simulations_total.items():
+                lines.append(f'simulations_total{{status="{status}"}} {count}')
+
+            lines.append("# HELP simulation_data_points_total Time steps simulated across all runs")
+            lines.append("# TYPE simulation_data_points_total counter")
+            lines.append(f"simulation_data_points_total {self.data_points_total}")
+
+            lines.append("# HELP simulations_in_progress Simulation requests accepted but not yet finished")
+            lines.append("# TYPE simulations_in_progress gauge")
+            lines.append(f"simulations_in_progress {self.in_progress}")
+
+            caches = sorted(set(self.cache_hits) | set(self.cache_misses))
+            lines.append("# HELP cache_hits_total Cache lookups served from memory")
+            lines.append("# TYPE cache_hits_total counter")
+            for cache in caches:
+                lines.append(f'cache_hits_total{{cache="{cache}"}} {self.cache_hits.get(cache, 0)}')
+            lines.append("# HELP cache_misses_total Cache lookups that had to load")
+            lines.append("# TYPE cache_misses_total counter")
+            for cache in caches:
+                lines.append(f'cache_misses_total{{cache="{cache}"}} {self.cache_misses.get(cache, 0)}')
+            lines.append("# HELP cache_hit_ratio Fraction of cache lookups served from memory")
+            lines.append("# TYPE cache_hit_ratio gauge")
+            for cache in caches:
+                hits = self.cache_hits.get(cache, 0)
+                total = hits + self.cache_misses.get(cache, 0)
+                lines.append(f'cache_hit_ratio{{cache="{cache}"}} {hits / total if total else 0.0}')
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _render_histogram(metric, histogram, labels=""):
+        prefix = f"{labels}," if labels else ""
+        lines = []
+        for upper, count in zip(histogram.buckets, histogram.counts):
+            lines.append(f'{metric}_bucket{{{prefix}le="{upper}"}} {count}')
+        lines.append(f'{metric}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{metric}_sum{suffix} {histogram.sum}")
+        lines.append(f"{metric}_count{suffix} {histogram.count}")
+        return lines
+
+
+metrics = MetricsRegistry()
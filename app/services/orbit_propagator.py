@@ -1,8 +1,52 @@
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from skyfield.api import load, EarthSatellite
 import pandas as pd
+import threading
 from abc import ABC, abstractmethod
+from typing import NamedTuple
+from app.services.metrics import metrics, StageTimer
+from app.services.results import SimulationResults, CHUNK_SIZE
+from app.services.panel_models import AntiNadirPanel
+from app.services.ground_stations import station_elevations
+
+# Parsed ephemeris and timescale are immutable, so one copy is shared by every run
+_astro_cache = {}
+_astro_cache_lock = threading.Lock()
+
+def _cached(key, loader):
+    with _astro_cache_lock:
+        if key in _astro_cache:
+            metrics.record_cache(key, hit=True)
+            return _astro_cache[key]
+        metrics.record_cache(key, hit=False)
+        value = loader()
+        _astro_cache[key] = value
+        return value
+
+def get_timescale():
+    return _cached("timescale", load.timescale)
+
+def get_ephemeris(filename='de421.bsp'):
+    return _cached(f"ephemeris:{filename}", lambda: load(filename))
+
+def parse_start_time(start_time):
+    """
+    ISO start time as a naive UTC datetime. Naive input is already UTC; an offset is
+    applied here, since every skyfield time is built from the wall-clock fields
+    """
+    start_dt = datetime.fromisoformat(start_time)
+    if start_dt.tzinfo is not None:
+        start_dt = start_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return start_dt
+
+class StepBatch(NamedTuple):
+    positions: np.ndarray        # (n, 3) km
+    sun_directions: np.ndarray   # (n, 3) unit vectors
+    in_shadow: np.ndarray        # (n,) bool
+    face_power: np.ndarray       # (n, n_faces) W
+    cos_angle: np.ndarray        # (n, n_faces) cosine of sun incidence angle per face
+    times: object                # skyfield Time array of the grid
 
 class OrbitPropagator(ABC):
 
@@ -16,6 +60,22 @@ class OrbitPropagator(ABC):
     def get_orbital_period(self):
         pass
 
+    # Generate satellite positions at start_dt + offsets_s (seconds), shape (n, 3)
+    def get_positions(self, start_dt, offsets_s):
+        return np.array([self.get_position(start_dt + timedelta(seconds=float(s))) for s in offsets_s])
+
+    # Unit orbit normal (angular momentum direction) at start_dt + offsets_s, shape (n, 3)
+    def get_orbit_normals(self, start_dt, offsets_s):
+        offsets_s = np.asarray(offsets_s, dtype=float)
+        r = self.get_positions(start_dt, offsets_s)
+        r_next = self.get_positions(start_dt, offsets_s + 1.0)
+        h = np.cross(r, r_next)
+        return h / np.linalg.norm(h, axis=1, keepdims=True)
+
+    # Positions and orbit normals together; propagators override this to share one pass
+    def get_positions_and_normals(self, start_dt, offsets_s):
+        return self.get_positions(start_dt, offsets_s), self.get_orbit_normals(start_dt, offsets_s)
+
 class CircularOrbitPropagator(OrbitPropagator):
 
     def __init__(self, altitude_km, inclination_deg, start_time):
@@ -26,11 +86,13 @@ class CircularOrbitPropagator(OrbitPropagator):
         """
         self.altitude_km = altitude_km
         self.inclination_deg = inclination_deg
-        self.start_dt = datetime.fromisoformat(start_time)
+        self.start_dt = parse_start_time(start_time)
         
         # Earth constants
         self.EARTH_RADIUS_KM = 6371
         self.EARTH_MU = 398600.4418  # km³/s² (Earth's gravitational parameter)
+        self.EARTH_J2 = 1.08263e-3  # Earth's oblateness coefficient
+        self.EARTH_EQUATORIAL_RADIUS_KM = 6378.137
         
         # Orbital radius calculation 
         self.orbital_radius = self.EARTH_RADIUS_KM + self.altitude_km
@@ -42,6 +104,12 @@ class CircularOrbitPropagator(OrbitPropagator):
         # Angular velocity (rad/s)
         self.angular_velocity = 2 * np.pi / period_seconds
         
+        # J2 secular drift of the ascending node (rad/s): dΩ/dt = -1.5·n·J2·(Re/a)²·cos i
+        # About -5°/day for a 500 km, 51.6° orbit; this is what moves beta through eclipse seasons
+        self.raan_rate = (-1.5 * self.angular_velocity * self.EARTH_J2
+                          * (self.EARTH_EQUATORIAL_RADIUS_KM / self.orbital_radius)**2
+                          * np.cos(np.radians(self.inclination_deg)))
+        
     def get_position(self, time_dt):
 
         # Time elapsed since start
@@ -63,7 +131,38 @@ class CircularOrbitPropagator(OrbitPropagator):
         y = y_orbit * np.cos(inc_rad) - z_orbit * np.sin(inc_rad)
         z = y_orbit * np.sin(inc_rad) + z_orbit * np.cos(inc_rad)
         
-        return np.array([x, y, z])
+        # Rotate around Z-axis by the ascending node's drift since start
+        raan = self.raan_rate * elapsed
+        return np.array([
+            x * np.cos(raan) - y * np.sin(raan),
+            x * np.sin(raan) + y * np.cos(raan),
+            z
+        ])
+    
+    def get_positions(self, start_dt, offsets_s):
+        # Same geometry as get_position, evaluated for all offsets at once
+        elapsed = (start_dt - self.start_dt).total_seconds() + np.asarray(offsets_s, dtype=float)
+        theta = self.angular_velocity * elapsed
+        inc_rad = np.radians(self.inclination_deg)
+        raan = self.raan_rate * elapsed
+        x = self.orbital_radius * np.cos(theta)
+        y = self.orbital_radius * np.sin(theta) * np.cos(inc_rad)
+        return np.column_stack([
+            x * np.cos(raan) - y * np.sin(raan),
+            x * np.sin(raan) + y * np.cos(raan),
+            self.orbital_radius * np.sin(theta) * np.sin(inc_rad)
+        ])
+    
+    def get_orbit_normals(self, start_dt, offsets_s):
+        # Normal of the inclined plane, [0, -sin i, cos i] at start, turned with the precessing node
+        elapsed = (start_dt - self.start_dt).total_seconds() + np.asarray(offsets_s, dtype=float)
+        inc_rad = np.radians(self.inclination_deg)
+        raan = self.raan_rate * elapsed
+        return np.column_stack([
+            np.sin(inc_rad) * np.sin(raan),
+            -np.sin(inc_rad) * np.cos(raan),
+            np.full(len(raan), np.cos(inc_rad))
+        ])
     
     def get_orbital_period(self):
         return self.orbital_period_minutes
@@ -76,7 +175,7 @@ class TLEOrbitPropagator(OrbitPropagator):
         tle_line2: Second line of TLE
         satellite_name: Name for reference
         """
-        self.ts = load.timescale()
+        self.ts = get_timescale()
         self.satellite = EarthSatellite(tle_line1, tle_line2, satellite_name, self.ts)
         
         # Extract orbital period from mean motion (in line 2)
@@ -98,124 +197,186 @@ class TLEOrbitPropagator(OrbitPropagator):
         
         return position
     
+    def _times(self, start_dt, offsets_s):
+        return self.ts.utc(start_dt.year, start_dt.month, start_dt.day, start_dt.hour, start_dt.minute,
+                           start_dt.second + np.asarray(offsets_s, dtype=float))
+    
+    def get_positions(self, start_dt, offsets_s):
+        return self.satellite.at(self._times(start_dt, offsets_s)).position.km.T
+    
+    def get_orbit_normals(self, start_dt, offsets_s):
+        return self.get_positions_and_normals(start_dt, offsets_s)[1]
+    
+    def get_positions_and_normals(self, start_dt, offsets_s):
+        geocentric = self.satellite.at(self._times(start_dt, offsets_s))
+        positions = geocentric.position.km.T
+        h = np.cross(positions, geocentric.velocity.km_per_s.T)
+        return positions, h / np.linalg.norm(h, axis=1, keepdims=True)
+    
     def get_orbital_period(self):
         return self.orbital_period_minutes
+
+def create_propagator(params, satellite_name="SAT"):
+    """
+    params: any request carrying the OrbitParametersBase and start_time fields
+    """
+    if params.propagation_method == "circular":
+        return CircularOrbitPropagator(
+            altitude_km=params.altitude_km,
+            inclination_deg=params.inclination_deg,
+            start_time=params.start_time
+        )
+    return TLEOrbitPropagator(
+        tle_line1=params.tle_line1,
+        tle_line2=params.tle_line2,
+        satellite_name=satellite_name
+    )
     
 class SolarPanelSimulator:
 
-    def __init__(self, orbit_propagator, panel_area_m2, panel_efficiency):
+    def __init__(self, orbit_propagator, panel_area_m2, panel_efficiency, panel_model=None):
         """
         orbit_propagator: CircularOrbitPropagator or TLEOrbitPropagator
         panel_area_m2: solar panel size (e.g., 15)
         panel_efficiency: 0.29 means 29%
+        panel_model: PanelModel for attitude and faces, defaults to one anti-nadir panel of panel_area_m2
         """
         self.propagator = orbit_propagator
         self.panel_area = panel_area_m2
         self.efficiency = panel_efficiency
+        self.panel_model = panel_model if panel_model is not None else AntiNadirPanel(panel_area_m2)
         
         # Constants
         self.SOLAR_CONSTANT = 1361  # W/m²
         self.EARTH_RADIUS_KM = 6371
         
         # Load astronomical data
-        self.ts = load.timescale()
-        self.planets = load('de421.bsp')
+        self.ts = get_timescale()
+        self.planets = get_ephemeris('de421.bsp')
         self.earth = self.planets['earth']
         self.sun = self.planets['sun']
     
-    def get_sun_direction(self, time_dt):
-        # Generate unit vector from Earth to Sun 
-        t = self.ts.utc(time_dt.year, time_dt.month, time_dt.day, time_dt.hour, time_dt.minute, time_dt.second)
-        
-        sun_position = self.earth.at(t).observe(self.sun).position.km
-        sun_direction = sun_position / np.linalg.norm(sun_position)
-        
-        return sun_direction
+    def get_times(self, start_dt, offsets_s):
+        # Skyfield Time array for start_dt + offsets_s (seconds)
+        return self.ts.utc(start_dt.year, start_dt.month, start_dt.day, start_dt.hour, start_dt.minute,
+                           start_dt.second + np.asarray(offsets_s, dtype=float))
+    
+    def get_sun_directions(self, start_dt, offsets_s, times=None):
+        # Unit vectors from Earth to Sun for start_dt + offsets_s (seconds), shape (n, 3)
+        t = times if times is not None else self.get_times(start_dt, offsets_s)
+        sun_positions = self.earth.at(t).observe(self.sun).position.km.T
+        return sun_positions / np.linalg.norm(sun_positions, axis=1, keepdims=True)
     
-    def is_in_shadow(self, satellite_pos, sun_direction):
+    def shadow_mask(self, positions, sun_directions):
+        # Earth blocks the sun when the satellite is on the dark side and within
+        # one Earth radius of the Earth-Sun line; (n, 3) positions and sun directions
+        projection = np.einsum('ij,ij->i', positions, sun_directions)
+        perpendicular_sq = np.einsum('ij,ij->i', positions, positions) - projection**2
+        return (projection <= 0) & (perpendicular_sq < self.EARTH_RADIUS_KM**2)
+    
+    def calculate_face_power(self, positions, sun_directions, in_shadow, orbit_normals=None):
+        """
+        Power = Solar_Constant x Area x Efficiency x cos(angle) for every face of the panel model at every step
+        Returns power and cos(angle), both shaped (n_steps, n_faces)
         """
-        Check if Earth blocks sunlight using dot product
-        If satellite on sunlit side, satellite not in shadow
-        If satellite on dark side, check if Earth blocks view
+        normals = self.panel_model.face_normals(positions, sun_directions, orbit_normals)
+        cos_angle = np.einsum('nfi,ni->nf', normals, sun_directions)
+        power = self.SOLAR_CONSTANT * self.efficiency * self.panel_model.face_areas * np.clip(cos_angle, 0, None)
+        power[in_shadow] = 0.0
+        return power, cos_angle
+    
+    def evaluate(self, start_dt, offsets_s, timer=None):
         """
-        # Normalize satellite position
-        sat_distance = np.linalg.norm(satellite_pos)
-        sat_direction = satellite_pos / sat_distance
-        
-        # Dot product: positive = same side as sun
-        dot = np.dot(sat_direction, sun_direction)
-        
-        if dot > 0:
-            # Satellite on sunlit side of Earth
-            return False
-        else:
-            # Satellite on dark side - check if Earth blocks sun
-            # Distance from Earth-Sun line to satellite
-            projection = np.dot(satellite_pos, sun_direction)
-            perpendicular_distance = np.sqrt(sat_distance**2 - projection**2)
-            
-            return perpendicular_distance < self.EARTH_RADIUS_KM
-    
-    def calculate_power(self, satellite_pos, sun_direction, in_shadow):
+        Positions, sun vectors, shadow and per-face power for start_dt + offsets_s
+        as one batched pass over all steps
         """
-        Power = Solar_Constant x Area x Efficiency x cos(angle)
+        timer = timer if timer is not None else StageTimer()
+        with timer.stage("propagation"):
+            if self.panel_model.requires_orbit_normal:
+                positions, orbit_normals = self.propagator.get_positions_and_normals(start_dt, offsets_s)
+            else:
+                positions, orbit_normals = self.propagator.get_positions(start_dt, offsets_s), None
+        
+        with timer.stage("sun_direction"):
+            times = self.get_times(start_dt, offsets_s)
+            sun_directions = self.get_sun_directions(start_dt, offsets_s, times)
+        
+        with timer.stage("shadow_power"):
+            in_shadow = self.shadow_mask(positions, sun_directions)
+            face_power, cos_angle = self.calculate_face_power(positions, sun_directions, in_shadow, orbit_normals)
+        
+        return StepBatch(positions, sun_directions, in_shadow, face_power, cos_angle, times)
+    
+    def run_simulation(self, start_time, duration_hours=3, time_step_seconds=60, timer=None, compact=False,
+                       ground_stations=None):
         """
-        if in_shadow:
-            return 0.0
-        
-        # Panel normal (points away from Earth - anti-nadir)
-        panel_normal = satellite_pos / np.linalg.norm(satellite_pos)
-        
-        # Angle between panel and sun
-        cos_angle = np.dot(panel_normal, sun_direction)
-        
-        # Only generate power if sun hits front of panel
-        if cos_angle > 0:
-            power = self.SOLAR_CONSTANT * self.panel_area * self.efficiency * cos_angle
-            return power
-        else:
-            return 0.0
-    
-    def run_simulation(self, start_time, duration_hours=3, time_step_seconds=60):
-        results = []
-        start_dt = datetime.fromisoformat(start_time)
-        current_dt = start_dt
-        end_dt = start_dt + timedelta(hours=duration_hours)
-        step = timedelta(seconds=time_step_seconds)
-        
-        step_count = 0
-        while current_dt <= end_dt:
-            # Get satellite position (works with ANY propagator!)
-            sat_pos = self.propagator.get_position(current_dt)
-            
-            # Get sun direction
-            sun_dir = self.get_sun_direction(current_dt)
-            
-            # Check shadow
-            in_shadow = self.is_in_shadow(sat_pos, sun_dir)
-            
-            # Calculate power
-            power = self.calculate_power(sat_pos, sun_dir, in_shadow)
-            
-            # Calculate additional metrics
-            panel_normal = sat_pos / np.linalg.norm(sat_pos)
-            sun_angle_deg = np.degrees(np.arccos(np.clip(np.dot(panel_normal, sun_dir), -1, 1)))
-            altitude = np.linalg.norm(sat_pos) - self.EARTH_RADIUS_KM
-            
-            results.append({
-                'time': current_dt,
+        timer: optional StageTimer; propagation, sun vector, shadow/power math and
+        DataFrame build are accumulated into it as separate stages
+        compact: return a preallocated SimulationResults instead of a DataFrame; the grid
+        is then evaluated CHUNK_SIZE steps at a time and written straight into it, so no
+        float64 array spans the whole run
+        ground_stations: optional stations (name, latitude_deg, longitude_deg, altitude_m);
+        adds an elevation_deg_<name> column per station from the same positions and time grid
+        """
+        timer = timer if timer is not None else StageTimer()
+        start_dt = parse_start_time(start_time)
+        
+        # Every step from start_time up to and including start_time + duration_hours
+        size = timedelta(hours=duration_hours) // timedelta(seconds=time_step_seconds) + 1
+        
+        station_names = [station.name for station in ground_stations or []]
+        # Per-face columns only add information when there is more than one face
+        face_names = self.panel_model.face_names if len(self.panel_model.face_names) > 1 else []
+        
+        if compact:
+            with timer.stage("results"):
+                results = SimulationResults(size, face_names, station_names)
+            for start in range(0, size, CHUNK_SIZE):
+                offsets = np.arange(start, min(start + CHUNK_SIZE, size), dtype=float) * time_step_seconds
+                batch, power, sun_angle_deg, altitude, elevations = self._step_columns(
+                    start_dt, offsets, timer, ground_stations
+                )
+                with timer.stage("results"):
+                    results.fill(start_dt, offsets, power, batch.in_shadow, sun_angle_deg, altitude,
+                                 batch.positions, batch.face_power, elevations, start=start)
+            return results
+        
+        offsets = np.arange(size, dtype=float) * time_step_seconds
+        batch, power, sun_angle_deg, altitude, elevations = self._step_columns(start_dt, offsets, timer, ground_stations)
+        
+        with timer.stage("dataframe"):
+            df = pd.DataFrame({
+                'time': pd.Timestamp(start_dt) + pd.to_timedelta(offsets, unit='s'),
                 'power_W': power,
-                'in_shadow': in_shadow,
+                'in_shadow': batch.in_shadow,
                 'sun_angle_deg': sun_angle_deg,
                 'altitude_km': altitude,
-                'position_x': sat_pos[0],
-                'position_y': sat_pos[1],
-                'position_z': sat_pos[2]
+                'position_x': batch.positions[:, 0],
+                'position_y': batch.positions[:, 1],
+                'position_z': batch.positions[:, 2]
             })
-            
-            current_dt += step
-            step_count += 1
+            for i, name in enumerate(face_names):
+                df[f'power_W_{name}'] = batch.face_power[:, i]
+            for i, name in enumerate(station_names):
+                df[f'elevation_deg_{name}'] = elevations[:, i]
+        
+        return df
+    
+    def _step_columns(self, start_dt, offsets, timer, ground_stations):
+        # Batch plus the derived per-step columns (total power, sun angle, altitude, station elevations)
+        batch = self.evaluate(start_dt, offsets, timer)
+        
+        with timer.stage("shadow_power"):
+            power = batch.face_power.sum(axis=1)
+            # Angle between the local zenith (anti-nadir) and the sun, whatever the panel model
+            zenith = batch.positions / np.linalg.norm(batch.positions, axis=1, keepdims=True)
+            cos_zenith = np.einsum('ij,ij->i', zenith, batch.sun_directions)
+            sun_angle_deg = np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+            altitude = np.linalg.norm(batch.positions, axis=1) - self.EARTH_RADIUS_KM
         
-        df = pd.DataFrame(results)
+        elevations = None
+        if ground_stations:
+            with timer.stage("ground_stations"):
+                elevations = station_elevations(ground_stations, batch.times, batch.positions)
         
-        return df
\ No newline at end of file
+        return batch, power, sun_angle_deg, altitude, elevations
@@ -0,0 +1,108 @@
+import numpy as np
+from abc import ABC, abstractmethod
+
+
+def body_to_inertial(positions, orbit_normals):
+    """
+    Rotation matrices (n, 3, 3) whose columns are the body axes in the inertial frame:
+    x = along-track, y = orbit normal, z = zenith (anti-nadir)
+    """
+    z = positions / np.linalg.norm(positions, axis=1, keepdims=True)
+    y = orbit_normals
+    x = np.cross(y, z)
+    return np.stack([x, y, z], axis=2)
+
+
+class PanelModel(ABC):
+    """
+    Attitude and geometry of the solar panels. A model is a set of faces, each
+    with a name and area, and produces every face's inertial normal for all
+    time steps at once as an (n_steps, n_faces, 3) array.
+    """
+
+    # Whether face_normals needs the orbit normal to build the body frame
+    requires_orbit_normal = False
+
+    def __init__(self, face_names, face_areas_m2):
+        self.face_names = list(face_names)
+        self.face_areas = np.asarray(face_areas_m2, dtype=float)
+
+    @abstractmethod
+    def face_normals(self, positions, sun_directions, orbit_normals=None):
+        pass
+
+
+class AntiNadirPanel(PanelModel):
+    """Single body-mounted panel whose normal points away from Earth"""
+
+    def __init__(self, panel_area_m2):
+        super().__init__(["panel"], [panel_area_m2])
+
+    def face_normals(self, positions, sun_directions, orbit_normals=None):
+        return (positions / np.linalg.norm(positions, axis=1, keepdims=True))[:, None, :]
+
+
+class SunTrackingPanel(PanelModel):
+    """Two-axis tracking array, normal always points at the sun"""
+
+    def __init__(self, panel_area_m2):
+        super().__init__(["panel"], [panel_area_m2])
+
+    def face_normals(self, positions, sun_directions, orbit_normals=None):
+        return sun_directions[:, None, :]
+
+
+class SingleAxisTrackingPanel(PanelModel):
+    """
+    Array rotating about one body axis (by default the orbit normal, like a
+    solar array drive) to face the sun as closely as that axis allows
+    """
+
+    requires_orbit_normal = True
+
+    def __init__(self, panel_area_m2, axis=(0.0, 1.0, 0.0)):
+        super().__init__(["panel"], [panel_area_m2])
+        axis = np.asarray(axis, dtype=float)
+        self.axis = axis / np.linalg.norm(axis)
+
+    def face_normals(self, positions, sun_directions, orbit_normals=None):
+        axis = body_to_inertial(positions, orbit_normals) @ self.axis
+        # Best achievable normal is the sun direction projected onto the rotation plane
+        normal = sun_directions - np.einsum('ij,ij->i', sun_directions, axis)[:, None] * axis
+        norm = np.linalg.norm(normal, axis=1, keepdims=True)
+        # Sun along the axis: no rotation helps, any normal in the plane gives zero power
+        zenith = positions / np.linalg.norm(positions, axis=1, keepdims=True)
+        normal = np.where(norm > 1e-9, normal / np.where(norm > 1e-9, norm, 1.0), zenith)
+        return normal[:, None, :]
+
+
+class BodyMountedPanels(PanelModel):
+    """Fixed panels on several spacecraft faces, each with its own body-frame normal and area"""
+
+    requires_orbit_normal = True
+
+    def __init__(self, face_names, body_normals, face_areas_m2):
+        super().__init__(face_names, face_areas_m2)
+        body_normals = np.asarray(body_normals, dtype=float)
+        self.body_normals = body_normals / np.linalg.norm(body_normals, axis=1, keepdims=True)
+
+    def face_normals(self, positions, sun_directions, orbit_normals=None):
+        rotation = body_to_inertial(positions, orbit_normals)
+        return np.einsum('nij,fj->nfi', rotation, self.body_normals)
+
+
+def create_panel_model(params):
+    """
+    params: any request carrying PanelParametersBase and PanelModelParametersBase fields
+    """
+    if params.panel_model == "sun_tracking":
+        return SunTrackingPanel(params.panel_area_m2)
+    if params.panel_model == "single_axis":
+        return SingleAxisTrackingPanel(params.panel_area_m2, axis=params.tracking_axis)
+    if params.panel_model == "body_panels":
+        return BodyMountedPanels(
+            [face.name for face in params.panel_faces],
+            [face.normal for face in params.panel_faces],
+            [face.area_m2 for face in params.panel_faces]
+        )
+    return AntiNadirPanel(params.panel_area_m2)
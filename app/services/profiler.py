@@ -0,0 +1,49 @@
+import sys
+import threading
+from collections import Counter
+
+
+class SamplingProfiler:
+    """
+    Lightweight wall-clock sampling profiler for a single request.
+    A background thread periodically snapshots the stack of the thread that
+    started the profiler and counts identical stacks. The result is written in
+    the collapsed-stack format understood by flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval_seconds=0.005, max_depth=64):
+        self.interval = interval_seconds
+        self.max_depth = max_depth
+        self.samples = Counter()
+        self._target_thread_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._target_thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target_thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, filepath):
+        with open(filepath, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Steps per chunk when filling or writing; a multiple of 8 so the packed shadow mask splits on byte boundaries
+CHUNK_SIZE = 8192
+
+COLUMNS = ('time', 'power_W', 'in_shadow', 'sun_angle_deg', 'altitude_km', 'position_x', 'position_y', 'position_z')
+
+
+class SimulationResults:
+    """
+    Compact, preallocated container for simulation time series.
+    Timestamps are int64 epoch seconds, physics columns float32 and the shadow
+    flags a packed bit mask, so a run holds roughly 30 bytes per step instead
+    of a list of dicts plus a float64/object DataFrame.
+    Columns are read with results['power_W'] like a DataFrame; to_dataframe()
+    builds a real DataFrame only when one is needed.
+    With several panel faces, each face's power is a power_W_<face> column,
+    and each ground station adds an elevation_deg_<station> column.
+    """
+
+    __slots__ = ('size', 'epoch_s', 'power_W', 'sun_angle_deg', 'altitude_km', 'position', 'shadow_bits',
+                 'face_names', 'face_power', 'station_names', 'elevation_deg')
+
+    def __init__(self, size, face_names=(), station_names=()):
+        self.size = size
+        self.epoch_s = np.zeros(size, dtype=np.int64)
+        self.power_W = np.zeros(size, dtype=np.float32)
+        self.sun_angle_deg = np.zeros(size, dtype=np.float32)
+        self.altitude_km = np.zeros(size, dtype=np.float32)
+        self.position = np.zeros((size, 3), dtype=np.float32)
+        self.shadow_bits = np.zeros((size + 7) // 8, dtype=np.uint8)
+        self.face_names = list(face_names)
+        self.face_power = np.zeros((size, len(self.face_names)), dtype=np.float32)
+        self.station_names = list(station_names)
+        self.elevation_deg = np.zeros((size, len(self.station_names)), dtype=np.float32)
+
+    @property
+    def columns(self):
+        return (COLUMNS + tuple(f'power_W_{name}' for name in self.face_names)
+                + tuple(f'elevation_deg_{name}' for name in self.station_names))
+
+    def fill(self, start_dt, offsets_s, power, in_shadow, sun_angle_deg, altitude_km, positions, face_power=None,
+             elevation_deg=None, start=0):
+        """
+        Copy one batched evaluation into rows start..start + len(offsets_s), downcasting
+        to the compact dtypes. start must be a multiple of 8, so chunks fill the packed
+        shadow mask whole bytes at a time.
+        start_dt: naive UTC datetime the offsets (seconds) are counted from
+        """
+        stop = start + len(offsets_s)
+        self.epoch_s[start:stop] = int((start_dt - _EPOCH).total_seconds()) + np.asarray(offsets_s).astype(np.int64)
+        self.power_W[start:stop] = power
+        self.sun_angle_deg[start:stop] = sun_angle_deg
+        self.altitude_km[start:stop] = altitude_km
+        self.position[start:stop] = positions
+        # Most significant bit first, so _column can unpack any byte-aligned slice
+        self.shadow_bits[start >> 3:(stop + 7) >> 3] = np.packbits(np.asarray(in_shadow, dtype=bool))
+        if self.face_names:
+            self.face_power[start:stop] = face_power
+        if self.station_names:
+            self.elevation_deg[start:stop] = elevation_deg
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, column):
+        return self._column(column, 0, self.size)
+
+    def _column(self, column, start, stop):
+        # start must be a multiple of 8 so the shadow mask slices on a byte boundary
+        if column == 'time':
+            return self.epoch_s[start:stop].astype('datetime64[s]')
+        if column == 'in_shadow':
+            stop = min(stop, self.size)
+            return np.unpackbits(self.shadow_bits[start >> 3:(stop + 7) >> 3], count=stop - start).astype(bool)
+        if column in ('position_x', 'position_y', 'position_z'):
+            return self.position[start:stop, 'xyz'.index(column[-1])]
+        if column in ('power_W', 'sun_angle_deg', 'altitude_km'):
+            return getattr(self, column)[start:stop]
+        if column.startswith('power_W_') and column[len('power_W_'):] in self.face_names:
+            return self.face_power[start:stop, self.face_names.index(column[len('power_W_'):])]
+        if column.startswith('elevation_deg_') and column[len('elevation_deg_'):] in self.station_names:
+            return self.elevation_deg[start:stop, self.station_names.index(column[len('elevation_deg_'):])]
+        raise KeyError(column)
+
+    def shadow_count(self):
+        return int(np.unpackbits(self.shadow_bits, count=self.size).sum())
+
+    def to_dataframe(self, step=1):
+        return pd.DataFrame({column: self[column][::step] for column in self.columns})
+
+    def write_csv(self, filepath, chunk_size=CHUNK_SIZE):
+        """Write CSV in chunks so the full DataFrame is never materialised"""
+        for start in range(0, max(self.size, 1), chunk_size):
+            chunk = pd.DataFrame({column: self._column(column, start, start + chunk_size) for column in self.columns})
+            chunk.to_csv(filepath, index=False, mode='w' if start == 0 else 'a', header=start == 0)
+
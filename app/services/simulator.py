@@ -1,16 +1,19 @@
 import uuid
 import os
-from datetime import datetime
+from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-import matplotlib
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
-from typing import Optional
-from app.schemas import SimulationRequest, SimulationResponse, SimulationStatistics, DataPoint
+from typing import Optional, Union
+from app.schemas import SimulationRequest, SimulationResponse, SimulationStatistics, FaceStatistics, DataPoint, GroundStation, ContactWindow
 from app.config import settings
-from app.services.orbit_propagator import CircularOrbitPropagator, TLEOrbitPropagator, SolarPanelSimulator, OrbitPropagator
+from app.services.orbit_propagator import SolarPanelSimulator, OrbitPropagator, create_propagator
 from app.database import get_db, SessionLocal
 from app.models import Simulation
+from app.services.metrics import metrics, StageTimer
+from app.services.results import SimulationResults
+from app.services.panel_models import PanelModel, create_panel_model
+from app.services.ground_stations import find_contact_windows
+from app.services.profiler import SamplingProfiler
 
 class SimulationService:
     def __init__(self):
@@ -19,46 +22,88 @@ class SimulationService:
     
     def run_simulation(self, request: SimulationRequest) -> SimulationResponse:
         sim_id = str(uuid.uuid4())
+        timer = StageTimer()
+        profiler = None
         
         try:
-            if request.propagation_method == "circular":
-                propagator = CircularOrbitPropagator(
-                    altitude_km=request.altitude_km,
-                    inclination_deg=request.inclination_deg,
-                    start_time=request.start_time
-                )
+            if request.profile and settings.PROFILING_ENABLED:
+                profiler = SamplingProfiler(interval_seconds=settings.PROFILING_INTERVAL_SECONDS)
+                with profiler:
+                    response = self._run(sim_id, request, timer)
+                response.profile_url = self.export_profile(sim_id, profiler)
             else:
-                propagator = TLEOrbitPropagator(
-                    tle_line1=request.tle_line1,
-                    tle_line2=request.tle_line2,
-                    satellite_name=f"SAT_{sim_id[:8]}"
+                response = self._run(sim_id, request, timer)
+            
+            metrics.observe_run(timer, status="success", data_points=response.statistics.total_data_points)
+            if request.include_timings:
+                response.timings_ms = timer.as_milliseconds()
+            return response
+            
+        except Exception as e:
+            with timer.stage("db_write"):
+                self.save_to_database(
+                    sim_id=sim_id,
+                    request=request,
+                    statistics=None,
+                    plot_url=None,
+                    csv_url=None,
+                    status="error",
+                    error_message=str(e)
                 )
+            metrics.observe_run(timer, status="error")
+
+            return SimulationResponse(
+                simulation_id=sim_id,
+                status="error",
+                message=f"Simulation failed: {str(e)}",
+                timings_ms=timer.as_milliseconds() if request.include_timings else None,
+                created_at=datetime.utcnow().isoformat()
+            )
+    
+    def _run(self, sim_id: str, request: SimulationRequest, timer: StageTimer) -> SimulationResponse:
+        with timer.stage("ephemeris_load"):
+            propagator = create_propagator(request, satellite_name=f"SAT_{sim_id[:8]}")
             
             simulator = SolarPanelSimulator(
                 orbit_propagator=propagator,
                 panel_area_m2=request.panel_area_m2,
-                panel_efficiency=request.panel_efficiency
-            )
-            
-            results_df = simulator.run_simulation(
-                start_time=request.start_time,
-                duration_hours=request.duration_hours,
-                time_step_seconds=request.time_step_seconds
+                panel_efficiency=request.panel_efficiency,
+                panel_model=create_panel_model(request)
             )
-            
+        
+        results_df = simulator.run_simulation(
+            start_time=request.start_time,
+            duration_hours=request.duration_hours,
+            time_step_seconds=request.time_step_seconds,
+            timer=timer,
+            compact=settings.COMPACT_RESULTS,
+            ground_stations=request.ground_stations
+        )
+        
+        with timer.stage("statistics"):
             statistics = self.calculate_statistics(results_df, propagator, request.time_step_seconds)
-            
-            plot_url = None
-            csv_url = None
-            
-            if request.generate_plot:
+            face_statistics = self.calculate_face_statistics(results_df, simulator.panel_model)
+        
+        contact_windows = None
+        if request.ground_stations:
+            with timer.stage("contacts"):
+                contact_windows = self.calculate_contact_windows(results_df, request.ground_stations)
+        
+        plot_url = None
+        csv_url = None
+        
+        if request.generate_plot:
+            with timer.stage("plot"):
                 plot_url = self.generate_plot(sim_id, results_df, request.propagation_method)
-            
-            if request.export_csv:
+        
+        if request.export_csv:
+            with timer.stage("csv"):
                 csv_url = self.export_csv(sim_id, results_df)
-            
+        
+        with timer.stage("data_points"):
             data_points = self.prepare_data_points(results_df, max_points=500)
 
+        with timer.stage("db_write"):
             self.save_to_database(
                 sim_id=sim_id,
                 request=request,
@@ -67,41 +112,29 @@ class SimulationService:
                 csv_url=csv_url,
                 status="success"
             )            
-            
-            return SimulationResponse(
-                simulation_id=sim_id,
-                status="success",
-                message="Simulation completed successfully",
-                statistics=statistics,
-                data_points=data_points,
-                plot_url=plot_url,
-                csv_url=csv_url,
-                created_at=datetime.utcnow().isoformat()
-            )
-            
-        except Exception as e:
-            self._save_to_database(
-                sim_id=sim_id,
-                request=request,
-                statistics=None,
-                plot_url=None,
-                csv_url=None,
-                status="error",
-                error_message=str(e)
-            )
-
-            return SimulationResponse(
-                simulation_id=sim_id,
-                status="error",
-                message=f"Simulation failed: {str(e)}",
-                created_at=datetime.utcnow().isoformat()
-            )
+        
+        return SimulationResponse(
+            simulation_id=sim_id,
+            status="success",
+            message="Simulation completed successfully",
+            statistics=statistics,
+            face_statistics=face_statistics,
+            contact_windows=contact_windows,
+            data_points=data_points,
+            plot_url=plot_url,
+            csv_url=csv_url,
+            created_at=datetime.utcnow().isoformat()
+        )
     
-    def calculate_statistics(self, df: pd.DataFrame, propagator: OrbitPropagator, time_step_seconds: int) -> SimulationStatistics:
-        shadow_count = df['in_shadow'].sum()
+    def calculate_statistics(self, df: Union[pd.DataFrame, SimulationResults], propagator: OrbitPropagator, time_step_seconds: int) -> SimulationStatistics:
+        if isinstance(df, SimulationResults):
+            shadow_count = df.shadow_count()
+        else:
+            shadow_count = df['in_shadow'].sum()
         return SimulationStatistics(
             max_power_W=float(df['power_W'].max()),
-            avg_power_W=float(df['power_W'].mean()),
+            # Accumulate in float64 even when the column is stored as float32
+            avg_power_W=float(np.asarray(df['power_W']).mean(dtype=np.float64)),
             min_altitude_km=float(df['altitude_km'].min()),
             max_altitude_km=float(df['altitude_km'].max()),
             eclipse_time_seconds=float(shadow_count * time_step_seconds),
@@ -110,11 +143,54 @@ class SimulationService:
             total_data_points=len(df)
         )
     
-    def prepare_data_points(self, df: pd.DataFrame, max_points: int = 500) -> list[DataPoint]:
-        if len(df) > max_points:
-            step = len(df) // max_points
+    def calculate_face_statistics(self, df: Union[pd.DataFrame, SimulationResults], panel_model: PanelModel) -> Optional[list[FaceStatistics]]:
+        """Per-face power, only reported when the panel model has several faces"""
+        columns = self._face_columns(df)
+        if not columns:
+            return None
+        face_areas = dict(zip(panel_model.face_names, panel_model.face_areas))
+        return [
+            FaceStatistics(
+                name=column[len('power_W_'):],
+                area_m2=float(face_areas[column[len('power_W_'):]]),
+                max_power_W=float(df[column].max()),
+                avg_power_W=float(np.asarray(df[column]).mean(dtype=np.float64))
+            )
+            for column in columns
+        ]
+    
+    def calculate_contact_windows(self, df: Union[pd.DataFrame, SimulationResults], stations: list[GroundStation]) -> list[ContactWindow]:
+        """Contact windows of every station, from the elevation columns of the same run, in start time order"""
+        times = np.asarray(df['time'], dtype='datetime64[ms]')
+        elapsed_s = (times - times[0]).astype(np.float64) / 1000
+        start = pd.Timestamp(times[0]).to_pydatetime()
+        
+        windows = []
+        for station in stations:
+            for start_s, end_s, max_elevation in find_contact_windows(
+                elapsed_s, df[f'elevation_deg_{station.name}'], station.min_elevation_deg
+            ):
+                windows.append(ContactWindow(
+                    station=station.name,
+                    start_time=(start + timedelta(seconds=start_s)).isoformat(),
+                    end_time=(start + timedelta(seconds=end_s)).isoformat(),
+                    duration_seconds=end_s - start_s,
+                    max_elevation_deg=max_elevation
+                ))
+        windows.sort(key=lambda window: window.start_time)
+        return windows
+    
+    def _face_columns(self, df: Union[pd.DataFrame, SimulationResults]) -> list[str]:
+        return [column for column in df.columns if column.startswith('power_W_')]
+    
+    def prepare_data_points(self, df: Union[pd.DataFrame, SimulationResults], max_points: int = 500) -> list[DataPoint]:
+        step = len(df) // max_points if len(df) > max_points else 1
+        if isinstance(df, SimulationResults):
+            df = df.to_dataframe(step=step)
+        elif step > 1:
             df = df.iloc[::step]
         
+        face_columns = self._face_columns(df)
         data_points = []
         for _, row in df.iterrows():
             data_points.append(DataPoint(
@@ -122,18 +198,30 @@ class SimulationService:
                 power_W=float(row['power_W']),
                 in_shadow=bool(row['in_shadow']),
                 sun_angle_deg=float(row['sun_angle_deg']),
-                altitude_km=float(row['altitude_km'])
+                altitude_km=float(row['altitude_km']),
+                face_power_W={column[len('power_W_'):]: float(row[column]) for column in face_columns} or None
             ))
         
         return data_points
     
-    def generate_plot(self, sim_id: str, df: pd.DataFrame, method: str) -> str:
-        fig, axes = plt.subplots(2, 1, figsize=(12, 8))
+    def generate_plot(self, sim_id: str, df: Union[pd.DataFrame, SimulationResults], method: str) -> str:
+        # matplotlib is only needed for plots, so keep it out of worker startup.
+        # A standalone Figure (not pyplot) keeps concurrent threadpool renders from
+        # sharing pyplot's global current figure
+        from matplotlib.figure import Figure
+
+        fig = Figure(figsize=(12, 8))
+        axes = fig.subplots(2, 1)
         
         # Power plot
         ax1 = axes[0]
-        ax1.plot(df['time'], df['power_W'], 'b-', linewidth=1.5)
+        ax1.plot(df['time'], df['power_W'], 'b-', linewidth=1.5, label='total')
         ax1.fill_between(df['time'], 0, df['power_W'], alpha=0.3)
+        face_columns = self._face_columns(df)
+        for column in face_columns:
+            ax1.plot(df['time'], df[column], linewidth=0.8, label=column[len('power_W_'):])
+        if face_columns:
+            ax1.legend(loc='upper right', fontsize='small')
         ax1.set_ylabel('Power (W)')
         ax1.set_title(f'Solar Panel Power Output ({method.upper()})')
         ax1.grid(True, alpha=0.3)
@@ -146,20 +234,29 @@ class SimulationService:
         ax2.set_title('Sun Angle')
         ax2.grid(True, alpha=0.3)
         
-        plt.tight_layout()
+        fig.tight_layout()
         
         filename = f"{sim_id}_plot.png"
         filepath = os.path.join(self.output_dir, filename)
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
+        fig.savefig(filepath, dpi=150, bbox_inches='tight')
         
         return f"/outputs/{filename}"
     
-    def export_csv(self, sim_id: str, df: pd.DataFrame) -> str:
+    def export_csv(self, sim_id: str, df: Union[pd.DataFrame, SimulationResults]) -> str:
         """Export results to CSV"""
         filename = f"{sim_id}_data.csv"
         filepath = os.path.join(self.output_dir, filename)
-        df.to_csv(filepath, index=False)
+        if isinstance(df, SimulationResults):
+            df.write_csv(filepath)
+        else:
+            df.to_csv(filepath, index=False)
+        return f"/outputs/{filename}"
+
+    def export_profile(self, sim_id: str, profiler: SamplingProfiler) -> str:
+        """Export sampled stacks in collapsed (flamegraph) format"""
+        filename = f"{sim_id}_profile.txt"
+        filepath = os.path.join(self.output_dir, filename)
+        profiler.write_collapsed(filepath)
         return f"/outputs/{filename}"
 
     def save_to_database(
@@ -0,0 +1,47 @@
+import time
+import logging
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupState:
+    """Tracks whether the process has finished preloading the data a simulation needs"""
+
+    def __init__(self):
+        self.ready = False
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.duration_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def run(self):
+        """
+        Load timescale and ephemeris into the shared cache and evaluate one sun
+        vector, so the first request does not pay for it. Blocking; run it off
+        the event loop.
+        A failed attempt is not retried: the process is still marked ready, with
+        error set, because simulations load the same data on demand. /ready then
+        reports "degraded" instead of holding the worker out of rotation forever.
+        """
+        self.started_at = datetime.utcnow()
+        start = time.perf_counter()
+        try:
+            from app.services.orbit_propagator import get_timescale, get_ephemeris
+
+            ts = get_timescale()
+            planets = get_ephemeris('de421.bsp')
+            t = ts.utc(self.started_at.year, self.started_at.month, self.started_at.day)
+            planets['earth'].at(t).observe(planets['sun'])
+        except Exception as e:
+            # Simulations still work without warmup, they just load on demand
+            self.error = str(e)
+            logger.exception("Warmup failed")
+        finally:
+            self.ready = True
+            self.finished_at = datetime.utcnow()
+            self.duration_seconds = time.perf_counter() - start
+
+
+warmup_state = WarmupState()